@@ -1,13 +1,15 @@
 # pylint: disable=too-many-lines
 
+import copy
 import csv
 import datetime
 import glob
 import json
 import os
 import re
+from operator import itemgetter
 from pathlib import Path
-from urllib.parse import unquote, urljoin
+from urllib.parse import parse_qs, unquote, urljoin, urlsplit
 
 import boto3
 import botocore
@@ -46,6 +48,8 @@ ELASTICSEARCH_API_KEY_ID = os.getenv('ELASTICSEARCH_API_KEY_ID')
 INCLUDE_IMAGES = os.getenv('INCLUDE_IMAGES', 'false').lower() == 'true'
 INCLUDE_VIDEOS = os.getenv('INCLUDE_VIDEOS', 'false').lower() == 'true'
 INCLUDE_EXTERNAL = os.getenv('INCLUDE_EXTERNAL', 'false').lower() == 'true'
+# Group siblings with these ACMI ID prefixes are loaned or external works
+EXTERNAL_WORK_PREFIXES = ('AEO', 'LN', 'P')
 
 application = Flask(__name__)
 api = Api(application)
@@ -81,12 +85,10 @@ class API(Resource):
         """
         Return a list of all API routes.
         """
-        routes = []
-        for route in application.url_map.iter_rules():
-            if 'static' not in str(route) and str(route) != '/':
-                routes.append(str(route))
-        routes.sort()
-        return routes
+        return sorted(
+            route for route in map(str, application.url_map.iter_rules())
+            if route != '/' and not route.startswith('/static')
+        )
 
 
 class AudioListAPI(Resource):  # pylint: disable=too-few-public-methods
@@ -518,6 +520,7 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
             'unpublished': False,
             'external': INCLUDE_EXTERNAL,
         }
+        self.session = requests.Session()
 
     def get(self, resource, params=None):
         """
@@ -529,7 +532,7 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
         retries = 0
         while retries < XOS_RETRIES:
             try:
-                response = requests.get(url=endpoint, params=params, timeout=XOS_TIMEOUT)
+                response = self.session.get(url=endpoint, params=params, timeout=XOS_TIMEOUT)
                 response.raise_for_status()
                 return response
             except (
@@ -567,7 +570,7 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
             works_saved += self.save_items(resource, works_json)
             if not works_json.get('next'):
                 break
-            params['page'] = furl(works_json.get('next')).args.get('page')
+            params['page'] = self.next_page(works_json.get('next'))
         print(f'Finished downloading {works_saved} {resource}.')
 
         if not ALL_WORKS:
@@ -592,7 +595,7 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
             audio_saved += self.save_items(resource, audio_json)
             if not audio_json.get('next'):
                 break
-            params['page'] = furl(audio_json.get('next')).args.get('page')
+            params['page'] = self.next_page(audio_json.get('next'))
         print(f'Finished downloading {audio_saved} {resource}.')
 
         json_directory = os.path.join(JSON_ROOT, resource)
@@ -617,7 +620,7 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
             constellations_saved += self.save_items(resource, constellations_json)
             if not constellations_json.get('next'):
                 break
-            params['page'] = furl(constellations_json.get('next')).args.get('page')
+            params['page'] = self.next_page(constellations_json.get('next'))
         print(f'Finished downloading {constellations_saved} {resource}.')
 
     def get_creators(self):
@@ -640,13 +643,19 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
             creators_saved += self.save_items(resource, creators_json)
             if not creators_json.get('next'):
                 break
-            params['page'] = furl(creators_json.get('next')).args.get('page')
+            params['page'] = self.next_page(creators_json.get('next'))
         print(f'Finished downloading {creators_saved} {resource}.')
 
         if not ALL_CREATORS:
             # TODO: Delete old creators lists if the collection shrinks # pylint: disable=fixme
             self.save_items_lists(resource)
 
+    def next_page(self, next_url):
+        """
+        Returns the page number from the next link of a paginated XOS response.
+        """
+        return parse_qs(urlsplit(next_url).query).get('page', [None])[0]
+
     def add_audio_labels(self, audio_json, audio_labels):
         """
         Adds a Label ID key to an audio_labels dict with the value set to the Audio ID.
@@ -684,14 +693,13 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
         Download and save items from XOS.
         """
         items_saved = 0
+        json_directory = os.path.join(JSON_ROOT, resource)
+        Path(json_directory).mkdir(parents=True, exist_ok=True)
         for result in items_json.get('results'):
             item_id = str(result.get('id'))
-            item_resource = os.path.join(f'{resource}/', item_id)
-            item_json = self.get(resource=item_resource).json()
+            item_json = self.get(resource=f'{resource}/{item_id}').json()
             item_json = self.update_assets(item_json)
             self.remove_external_works(item_json)
-            json_directory = os.path.join(JSON_ROOT, resource)
-            Path(json_directory).mkdir(parents=True, exist_ok=True)
             json_file_path = os.path.join(json_directory, f'{item_id}.json')
             with open(json_file_path, 'w', encoding='utf-8') as json_file:
                 json.dump(item_json, json_file, ensure_ascii=False, indent=None)
@@ -722,7 +730,7 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
                     self.update_assets(result, delete=True)
             if not works_json.get('next'):
                 break
-            params['page'] = furl(works_json.get('next')).args.get('page')
+            params['page'] = self.next_page(works_json.get('next'))
 
         for work_id in work_ids_to_delete:
             json_file_path = os.path.join(JSON_ROOT, resource, f'{work_id}.json')
@@ -753,12 +761,14 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
             self.save_list(resource, works_json, params.get('page'))
             if not works_json.get('next'):
                 break
-            params['page'] = furl(works_json.get('next')).args.get('page')
+            params['page'] = self.next_page(works_json.get('next'))
 
-    def update_assets(self, item_json, delete=False):
+    def update_assets(self, item_json, delete=False, include_images=None, include_videos=None):
         """
         Upload images/videos to a public bucket, and update the links in the json.
+        The caller's item_json is never modified.
         """
+        source_json = item_json
         # Upload assets to ACMI public API bucket
         asset_regex = r'(https:\/\/[a-z0-9\-]+\.s3[a-z0-9\-\.]+amazonaws\.com.*?)\?'
         assets = re.findall(asset_regex, str(item_json))
@@ -807,10 +817,41 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
                 )
                 item_json = json.loads(item_json_string)
 
-        if not INCLUDE_IMAGES:
+        if delete:
+            return item_json
+
+        return self.remove_excluded_assets(
+            item_json,
+            include_images,
+            include_videos,
+            copy_json=item_json is source_json,
+        )
+
+    def remove_excluded_assets(
+        self,
+        item_json,
+        include_images=None,
+        include_videos=None,
+        copy_json=False,
+    ):
+        """
+        Remove images/videos that aren't included, defaulting to the INCLUDE_IMAGES
+        and INCLUDE_VIDEOS settings. Works on a copy of item_json if copy_json is set.
+        """
+        if include_images is None:
+            include_images = INCLUDE_IMAGES
+        if include_videos is None:
+            include_videos = INCLUDE_VIDEOS
+        if include_images and include_videos:
+            return item_json
+
+        if copy_json:
+            item_json = copy.deepcopy(item_json)
+
+        if not include_images:
             self.remove_assets(item_json, 'images')
 
-        if not INCLUDE_VIDEOS:
+        if not include_videos:
             self.remove_assets(item_json, 'videos')
             self.remove_assets(item_json, 'video')
             self.remove_video_links(item_json)
@@ -839,18 +880,13 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
         Note: we want to fix this in the XOS external=false filter
         but for now let's do it here for launch.
         """
-        loaned_work_prefixes = [
-            'AEO',
-            'LN',
-            'P',
-        ]
         if work_json.get('id'):
             # Individual record
-            self.remove_sibling(work_json, loaned_work_prefixes)
+            self.remove_sibling(work_json, EXTERNAL_WORK_PREFIXES)
         else:
             # Index page of records
             for work in work_json['results']:
-                self.remove_sibling(work, loaned_work_prefixes)
+                self.remove_sibling(work, EXTERNAL_WORK_PREFIXES)
 
     def remove_sibling(self, work_json, prefixes):
         """
@@ -858,16 +894,20 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
         starts with one of the prefixes.
         """
         try:
-            for sibling in work_json['group_siblings'][:]:
-                for prefix in prefixes:
-                    if sibling['acmi_id'].startswith(prefix):
-                        print(
-                            f'Removing group sibling: {sibling["id"]}, '
-                            f'ACMI ID: {sibling["acmi_id"]} from: {work_json["id"]}'
-                        )
-                        work_json['group_siblings'].remove(sibling)
+            group_siblings = work_json['group_siblings']
         except KeyError:
-            pass
+            return
+        prefixes = tuple(prefixes)
+        siblings = []
+        for sibling in group_siblings:
+            if sibling.get('acmi_id', '').startswith(prefixes):
+                print(
+                    f'Removing group sibling: {sibling["id"]}, '
+                    f'ACMI ID: {sibling["acmi_id"]} from: {work_json["id"]}'
+                )
+            else:
+                siblings.append(sibling)
+        group_siblings[:] = siblings
 
     def remove_all_thumbnails(self, item_json):  # pylint: disable=too-many-branches
         """
@@ -961,7 +1001,7 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
         Return a comma separated string of keys from a list of dictionaries.
         """
         try:
-            return ','.join([str(list_item[your_key]) for list_item in your_list])
+            return ','.join(map(str, map(itemgetter(your_key), your_list)))
         except (KeyError, TypeError):
             return ''
 
@@ -969,17 +1009,19 @@ class XOSAPI():  # pylint: disable=too-many-public-methods
         """
         Return the value of an key from a nested item.
         """
-        try:
-            return json_data[nested_list[0]][nested_list[1]]
-        except (KeyError, TypeError):
-            return default_value
+        value = json_data
+        for key in nested_list:
+            if not isinstance(value, dict) or key not in value:
+                return default_value
+            value = value[key]
+        return value
 
     def strings_from_list(self, your_list):
         """
         Return a comma separated list of strings from a list.
         """
         try:
-            return ','.join(str(label) for label in your_list)
+            return ','.join(map(str, your_list))
         except TypeError:
             return ''
 
@@ -1,9 +1,13 @@
-import datetime
+import math
 import statistics
-
-from furl import furl
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from api import ACMI_API_ENDPOINT, XOSAPI
+from requests.adapters import HTTPAdapter
+
+SPEED_TEST_PAGES = 100
+SPEED_TEST_WORKERS = 16
 
 
 class SpeedTest(XOSAPI):
@@ -13,34 +17,51 @@ class SpeedTest(XOSAPI):
     def __init__(self):
         super().__init__()
         self.uri = ACMI_API_ENDPOINT
+        # Pool a connection per worker so concurrent requests reuse them
+        adapter = HTTPAdapter(pool_maxsize=SPEED_TEST_WORKERS)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
 
     def start(self, resource='works'):
         """
         Get 100 pages of Work index json files and return the average response time.
+        The remaining pages are fetched concurrently by SPEED_TEST_WORKERS threads.
         """
         params = {
             'page_size': 10,
             'unpublished': False,
         }
-        average_times = []
-        total_requests = 0
-        start = datetime.datetime.now()
-        while total_requests < 100:
-            start = datetime.datetime.now()
-            total_requests += 1
-            works_json = self.get(resource, params).json()
-            end = datetime.datetime.now()
-            average_times.append((end - start).total_seconds())
-            if not works_json.get('next'):
-                break
-            params['page'] = furl(works_json.get('next')).args.get('page')
+        response_time, works_json = self.timed_get(resource, params)
+        average_times = [response_time]
+        total_requests = 1
+        if works_json.get('next'):
+            total_requests = max(1, min(
+                math.ceil(works_json.get('count', 0) / params['page_size']),
+                SPEED_TEST_PAGES,
+            ))
+        with ThreadPoolExecutor(max_workers=SPEED_TEST_WORKERS) as executor:
+            responses = executor.map(
+                lambda page: self.timed_get(resource, {**params, 'page': page}),
+                range(2, total_requests + 1),
+            )
+            average_times.extend(elapsed for elapsed, _ in responses)
         average_request_time = round(statistics.mean(average_times) * 1000)
         print(
-            f'Speed test finished.\nAverage time: {average_request_time} milliseconds\n'
+            f'Speed test finished.\nAverage time: {average_request_time} milliseconds '
+            f'with {SPEED_TEST_WORKERS} concurrent requests\n'
             f'Requests: {len(average_times)}/{total_requests}'
         )
         return average_request_time
 
+    def timed_get(self, resource, params):
+        """
+        Returns the response time in seconds and the json for this resource page.
+        """
+        start = time.perf_counter_ns()
+        response_json = self.get(resource, params).json()
+        end = time.perf_counter_ns()
+        return (end - start) / 1e9, response_json
+
 
 if __name__ == '__main__':
     print('======================')
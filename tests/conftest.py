@@ -0,0 +1,37 @@
+import pytest
+
+import app.api as acmi_api
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--runslow',
+        action='store_true',
+        default=False,
+        help='Run tests marked as slow',
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: mark a test as slow to run')
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    Skip tests marked as slow unless --runslow is passed.
+    """
+    if config.getoption('--runslow'):
+        return
+    skip_slow = pytest.mark.skip(reason='Needs --runslow to run')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip_slow)
+
+
+@pytest.fixture(name='client', scope='session')
+def fixture_client():
+    """
+    A Flask test client shared by every API view test in the session.
+    """
+    with acmi_api.application.test_client() as client:
+        yield client
@@ -1,8 +1,14 @@
 # pylint: disable=too-many-lines
 
+import copy
 import csv
+import io
 import json
 import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
 from unittest.mock import MagicMock, mock_open, patch
 
 import botocore
@@ -13,14 +19,85 @@ import requests
 import app.api as acmi_api
 from app.api import API, AWS_STORAGE_BUCKET_NAME, XOSAPI
 
+TEST_DATA_ROOT = Path(__file__).parent / 'data'
+SHARED_MEMORY_ROOT = '/dev/shm'
+SEARCH_FIXTURE_REGEX = re.compile(
+    r'^search_([^_]+)_([^_]+)(?:_([^_]+))?_(\d+)_(\d+)\.json$'
+)
+
+
+def load_fixtures():
+    """
+    Read every JSON fixture in tests/data once, keyed by filename.
+    """
+    fixtures = {}
+    with os.scandir(TEST_DATA_ROOT) as entries:
+        for entry in entries:
+            if entry.name.endswith('.json'):
+                with open(entry.path, 'rb') as json_file:
+                    fixtures[entry.name] = json_file.read()
+    return fixtures
+
+
+FIXTURES = load_fixtures()
+PARSED_FIXTURES = {
+    filename: json.loads(fixture) for filename, fixture in FIXTURES.items()
+}
+
+
+def load_search_fixtures():
+    """
+    Key the parsed search fixtures by (index, query, field, size, from).
+    e.g. search_works_dog_title_4_8.json -> ('works', 'dog', 'title', 4, 8)
+    """
+    search_fixtures = {}
+    for filename, fixture in PARSED_FIXTURES.items():
+        match = SEARCH_FIXTURE_REGEX.match(filename)
+        if match:
+            index, query, field, size, start = match.groups()
+            search_fixtures[(index, query, field, int(size), int(start))] = fixture
+    return search_fixtures
+
+
+SEARCH_FIXTURES = load_search_fixtures()
+INDEX_FIXTURES = {
+    'works': 'index.json',
+    'audio': 'audio_index.json',
+    'constellations': 'constellation_index.json',
+    'creators': 'creator_index.json',
+}
+ITEM_FIXTURES = {
+    'works': '1.json',
+    'audio': 'audio_1.json',
+    'constellations': 'constellation_1.json',
+    'creators': 'creator_34373.json',
+}
+
+# XOS API fixtures by url, and for index pages by (page, unpublished)
+XOS_FIXTURES = {
+    'https://xos.acmi.net.au/api/works/': {
+        ('1', False): 'index.json',
+        ('1', True): 'index.json',
+        ('2', False): 'index_page_2.json',
+        ('2', True): 'index_page_2_unpublished.json',
+    },
+    'https://xos.acmi.net.au/api/works/1/': '1.json',
+    'https://xos.acmi.net.au/api/works/2/': '2.json',
+}
+
 
 class MockResponse:
-    def __init__(self, json_data, status_code):
-        self.content = json.loads(json_data)
+    __slots__ = ('content', 'status_code', 'json_data')
+
+    def __init__(self, content, status_code):
+        self.content = content
         self.status_code = status_code
+        self.json_data = None
 
     def json(self):
-        return self.content
+        if self.json_data is None:
+            self.json_data = json.loads(self.content)
+        return self.json_data
 
     def raise_for_status(self):
         return None
@@ -33,53 +110,47 @@ class NoDataException(Exception):
 
 
 def mocked_requests_get(*args, **kwargs):
-    if kwargs['url'] == 'https://xos.acmi.net.au/api/works/':
-        if kwargs['params'].get('page') == '2':
-            if kwargs['params'].get('unpublished'):
-                with open('tests/data/index_page_2_unpublished.json', 'rb') as json_file:
-                    return MockResponse(json_file.read(), 200)
-            with open('tests/data/index_page_2.json', 'rb') as json_file:
-                return MockResponse(json_file.read(), 200)
-        with open('tests/data/index.json', 'rb') as json_file:
-            return MockResponse(json_file.read(), 200)
-    if kwargs['url'] == 'https://xos.acmi.net.au/api/works/1/':
-        with open('tests/data/1.json', 'rb') as json_file:
-            return MockResponse(json_file.read(), 200)
-    if kwargs['url'] == 'https://xos.acmi.net.au/api/works/2/':
-        with open('tests/data/2.json', 'rb') as json_file:
-            return MockResponse(json_file.read(), 200)
+    fixture = XOS_FIXTURES.get(kwargs['url'])
+    if isinstance(fixture, dict):
+        params = kwargs['params']
+        fixture = fixture.get((str(params.get('page', 1)), bool(params.get('unpublished'))))
+    if fixture:
+        return MockResponse(FIXTURES[fixture], 200)
 
     raise NoDataException("No mocked sample data for request: " + kwargs['url'])
 
 
+S3_OBJECT = MagicMock()
+S3_NOT_FOUND = botocore.exceptions.ClientError(
+    error_response={'Error': {'Code': '404'}},
+    operation_name='HeadObject',
+)
+
+
 def mock_boto3(_, key):
     """
     Mock boto3 responses.
     """
     if key == 'image/image-to-delete.jpg':
-        return MagicMock()
-    raise botocore.exceptions.ClientError(
-        error_response={'Error': {'Code': '404'}},
-        operation_name='HeadObject',
-    )
+        return S3_OBJECT
+    raise S3_NOT_FOUND.with_traceback(None)
+
+
+def mock_open_bytes(read_data):
+    """
+    A lightweight stand-in for open() that reads read_data from memory for any file.
+    """
+    def mocked_open(*args, **kwargs):
+        return io.BytesIO(read_data)
+    return mocked_open
 
 
 def mock_index(resource='works'):
     """
     Mocked index.json data.
     """
-    if resource == 'works':
-        with open('tests/data/index.json', 'rb') as json_file:
-            return mock_open(read_data=json_file.read())
-    if resource == 'audio':
-        with open('tests/data/audio_index.json', 'rb') as json_file:
-            return mock_open(read_data=json_file.read())
-    if resource == 'constellations':
-        with open('tests/data/constellation_index.json', 'rb') as json_file:
-            return mock_open(read_data=json_file.read())
-    if resource == 'creators':
-        with open('tests/data/creator_index.json', 'rb') as json_file:
-            return mock_open(read_data=json_file.read())
+    if resource in INDEX_FIXTURES:
+        return mock_open_bytes(FIXTURES[INDEX_FIXTURES[resource]])
     return None
 
 
@@ -87,18 +158,8 @@ def mock_item(resource='works'):
     """
     Mocked individual item.json data.
     """
-    if resource == 'works':
-        with open('tests/data/1.json', 'rb') as json_file:
-            return mock_open(read_data=json_file.read())
-    if resource == 'audio':
-        with open('tests/data/audio_1.json', 'rb') as json_file:
-            return mock_open(read_data=json_file.read())
-    if resource == 'constellations':
-        with open('tests/data/constellation_1.json', 'rb') as json_file:
-            return mock_open(read_data=json_file.read())
-    if resource == 'creators':
-        with open('tests/data/creator_34373.json', 'rb') as json_file:
-            return mock_open(read_data=json_file.read())
+    if resource in ITEM_FIXTURES:
+        return mock_open_bytes(FIXTURES[ITEM_FIXTURES[resource]])
     return None
 
 
@@ -136,29 +197,97 @@ def mock_search(index=None, body=None, q=None, params=None):  # pylint: disable=
             message='Connection timeout',
         )
     if q and not body:
-        with open(
-            f'tests/data/search_{index}_{q}_{params["size"]}_{params["from"]}.json',
-            'rb',
-        ) as json_file:
-            return json.loads(json_file.read())
-    elif body and not q:
-        key = [key for key in body['query']['match'].keys()][0]  # pylint: disable=unnecessary-comprehension
-        with open(
-            f'tests/data/search_{index}_{body["query"]["match"][key]}_'
-            f'{key}_{body["size"]}_{body["from"]}.json',
-            'rb',
-        ) as json_file:
-            return json.loads(json_file.read())
+        return SEARCH_FIXTURES[(index, q, None, params['size'], params['from'])]
+    if body and not q:
+        key = next(iter(body['query']['match']))
+        return SEARCH_FIXTURES[
+            (index, body['query']['match'][key], key, body['size'], body['from'])
+        ]
     raise elasticsearch.exceptions.NotFoundError
 
 
+# Shared mock for Elasticsearch searches, reset after every test by reset_mocks
+MOCK_SEARCH = MagicMock(side_effect=mock_search)
+
+
+@pytest.fixture(name='es_mock')
+def fixture_es_mock(monkeypatch):
+    """
+    Answer Elasticsearch searches from the search fixtures.
+    """
+    monkeypatch.setattr(elasticsearch.Elasticsearch, 'search', MOCK_SEARCH)
+    return MOCK_SEARCH
+
+
+@pytest.fixture(name='json_root')
+def fixture_json_root(tmp_path, monkeypatch):
+    """
+    Point JSON_ROOT at a shared memory directory when there is one, or under tmp_path.
+    Note: shared memory directories left by crashed runs stay in RAM until removed
+    by hand or a reboot, because pytest's tmp_path retention doesn't clean them up.
+    """
+    shared_memory = os.access(SHARED_MEMORY_ROOT, os.W_OK)
+    if shared_memory:
+        json_root = Path(tempfile.mkdtemp(dir=SHARED_MEMORY_ROOT))
+    else:
+        json_root = tmp_path / 'json'
+    monkeypatch.setattr(acmi_api, 'JSON_ROOT', json_root)
+    yield json_root
+    if shared_memory:
+        shutil.rmtree(json_root, ignore_errors=True)
+
+
+@pytest.fixture(name='mock_s3')
+def fixture_mock_s3(monkeypatch):
+    """
+    Mock the public S3 bucket the update_assets tests copy assets into.
+    """
+    monkeypatch.setattr(acmi_api.s3_resource, 'Object', mock_boto3)
+    monkeypatch.setattr(acmi_api, 'destination_bucket', MagicMock())
+
+
+@pytest.fixture(name='xos_private_api')
+def fixture_xos_private_api():
+    """
+    A fresh XOS private API interface, so tests can't leak params to each other.
+    """
+    return XOSAPI()
+
+
+@pytest.fixture(autouse=True)
+def reset_mocks():
+    """
+    Clear the calls recorded on the shared mocks once each test finishes.
+    """
+    yield
+    for mock in (MOCK_SEARCH, S3_OBJECT):
+        mock.reset_mock()
+
+
+@pytest.fixture(autouse=True)
+def reset_settings(monkeypatch):
+    """
+    Restore the app.api settings tests change, so no test depends on another's leftovers.
+    """
+    for setting in (
+        'JSON_ROOT',
+        'TSV_ROOT',
+        'INCLUDE_IMAGES',
+        'INCLUDE_VIDEOS',
+        'INCLUDE_EXTERNAL',
+        'ALL_CREATORS',
+        'ALL_WORKS',
+    ):
+        monkeypatch.setattr(acmi_api, setting, getattr(acmi_api, setting))
+
+
 def test_api_root():
     """
     Test the API root returns expected content.
     """
-    api = API()
-    assert api.get()['message'] == 'Welcome to the ACMI Public API.'
-    assert api.get()['api'] == [
+    api_root = API().get()
+    assert api_root['message'] == 'Welcome to the ACMI Public API.'
+    assert api_root['api'] == [
         '/audio/',
         '/audio/<audio_id>/',
         '/constellations/',
@@ -170,208 +299,126 @@ def test_api_root():
         '/works/<work_id>/',
     ]
     assert 'ACMI would like to acknowledge the Traditional Custodians'\
-        in api.get()['acknowledgement']
+        in api_root['acknowledgement']
 
 
-@patch('builtins.open', mock_index())
-def test_works_api():
+@pytest.mark.parametrize('resource', ['works', 'audio', 'constellations', 'creators'])
+def test_list_api(client, resource):
     """
-    Test the Works API returns expected content.
+    Test the Works, Audio, Constellations and Creators list APIs return expected content.
     """
-    with acmi_api.application.test_client() as client:
+    with patch('builtins.open', mock_index(resource=resource)):
         response = client.get(
-            '/works/',
+            f'/{resource}/',
             content_type='application/json',
         )
-        assert response.status_code == 200
-        assert response.json['next'] == 'https://api.acmi.net.au/works/?page=2'
-        assert response.json['results']
-        assert response.json['count']
+    assert response.status_code == 200
+    assert response.json['next'] == f'https://api.acmi.net.au/{resource}/?page=2'
+    assert response.json['results']
+    assert response.json['count']
 
 
 @patch('builtins.open', mock_file_not_found())
-def test_works_api_404():
+@pytest.mark.parametrize('url', ['/works/?page=999999', '/works/?page=!~*&-evil-text"'])
+def test_works_api_404(client, url):
     """
     Test the Works API returns a 404 as expected.
     """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/works/?page=999999',
-            content_type='application/json',
-        )
-        assert response.status_code == 404
-        assert response.json['message'] == 'That Works list doesn\'t exist, sorry.'
-
-        response = client.get(
-            '/works/?page=!~*&-evil-text"',
-            content_type='application/json',
-        )
-        assert response.status_code == 404
-        assert response.json['message'] == 'That Works list doesn\'t exist, sorry.'
+    response = client.get(
+        url,
+        content_type='application/json',
+    )
+    assert response.status_code == 404
+    assert response.json['message'] == 'That Works list doesn\'t exist, sorry.'
 
 
-@patch('builtins.open', mock_item())
-def test_work_api():
+@pytest.mark.parametrize(
+    'resource, item_id, field, value',
+    [
+        ('works', 1, 'description', 'Work data returned from the filesystem.'),
+        ('constellations', 1, 'name', 'Pen names, poems and puppets'),
+        ('creators', 34373, 'name', 'Agnes Varda'),
+    ],
+)
+def test_item_api(client, resource, item_id, field, value):
     """
-    Test the individual Work API returns expected content.
+    Test the individual Work, Constellation and Creator APIs return expected content.
     """
-    with acmi_api.application.test_client() as client:
+    with patch('builtins.open', mock_item(resource=resource)):
         response = client.get(
-            '/works/1/',
+            f'/{resource}/{item_id}/',
             content_type='application/json',
         )
-        assert response.status_code == 200
-        assert response.json['id'] == 1
-        assert response.json['description'] == 'Work data returned from the filesystem.'
+    assert response.status_code == 200
+    assert response.json['id'] == item_id
+    assert response.json[field] == value
 
 
 @patch('builtins.open', mock_file_not_found())
-def test_work_api_404():
+@pytest.mark.parametrize('url', ['/works/2/', '/works/!~*&-evil-text"/'])
+def test_work_api_404(client, url):
     """
     Test the individual Work API returns a 404 as expected.
     """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/works/2/',
-            content_type='application/json',
-        )
-        assert response.status_code == 404
-        assert response.json['message'] == 'That Work doesn\'t exist, sorry.'
-
-        response = client.get(
-            '/works/!~*&-evil-text"/',
-            content_type='application/json',
-        )
-        assert response.status_code == 404
-        assert response.json['message'] == 'That Work doesn\'t exist, sorry.'
+    response = client.get(
+        url,
+        content_type='application/json',
+    )
+    assert response.status_code == 404
+    assert response.json['message'] == 'That Work doesn\'t exist, sorry.'
 
 
 @patch('builtins.open', mock_index(resource='audio'))
-def test_audio_list_api():
+def test_audio_list_api(client):
     """
-    Test the Audio List API returns expected content.
+    Test the Audio List API returns no results for an unknown label.
     """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/audio/',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['next'] == 'https://api.acmi.net.au/audio/?page=2'
-        assert response.json['results']
-        assert response.json['count']
-
-        response = client.get(
-            '/audio/?labels=123',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert not response.json['next']
-        assert not response.json['results']
-        assert response.json['count'] == 0
+    response = client.get(
+        '/audio/?labels=123',
+        content_type='application/json',
+    )
+    assert response.status_code == 200
+    assert not response.json['next']
+    assert not response.json['results']
+    assert response.json['count'] == 0
 
 
-def test_audio_list_api_labels_filter():
+def test_audio_list_api_labels_filter(client):
     """
     Test the Audio List API labels filter returns expected content.
     """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/audio/?labels=61314',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert not response.json['next']
-        assert response.json['count'] == 1
-        assert response.json['results'][0]['id'] == 1
+    response = client.get(
+        '/audio/?labels=61314',
+        content_type='application/json',
+    )
+    assert response.status_code == 200
+    assert not response.json['next']
+    assert response.json['count'] == 1
+    assert response.json['results'][0]['id'] == 1
 
 
 @patch('builtins.open', mock_item(resource='audio'))
-def test_audio_api():
+def test_audio_api(client):
     """
     Test the individual Audio API returns expected content.
     """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/audio/1/',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['id'] == 1
-        assert response.json['work']['id'] == 122500
-        assert response.json['work']['labels'][0] == 61958
-        assert 'work_122500.mp3' in response.json['resource']
-
-
-@patch('builtins.open', mock_index(resource='constellations'))
-def test_constellations_api():
-    """
-    Test the Constellations API returns expected content.
-    """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/constellations/',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['next'] == 'https://api.acmi.net.au/constellations/?page=2'
-        assert response.json['results']
-        assert response.json['count']
-
-
-@patch('builtins.open', mock_item(resource='constellations'))
-def test_constellation_api():
-    """
-    Test the individual Constellation API returns expected content.
-    """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/constellations/1/',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['id'] == 1
-        assert response.json['name'] == 'Pen names, poems and puppets'
-
-
-@patch('builtins.open', mock_index(resource='creators'))
-def test_creators_api():
-    """
-    Test the Creators API returns expected content.
-    """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/creators/',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['next'] == 'https://api.acmi.net.au/creators/?page=2'
-        assert response.json['results']
-        assert response.json['count']
-
-
-@patch('builtins.open', mock_item(resource='creators'))
-def test_creator_api():
-    """
-    Test the individual Creator API returns expected content.
-    """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/creators/34373/',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['id'] == 34373
-        assert response.json['name'] == 'Agnes Varda'
+    response = client.get(
+        '/audio/1/',
+        content_type='application/json',
+    )
+    assert response.status_code == 200
+    assert response.json['id'] == 1
+    assert response.json['work']['id'] == 122500
+    assert response.json['work']['labels'][0] == 61958
+    assert 'work_122500.mp3' in response.json['resource']
 
 
-@patch('requests.get', MagicMock(side_effect=mocked_requests_get))
-def test_get_works(tmp_path):
+@patch('requests.Session.get', mocked_requests_get)
+@pytest.mark.usefixtures('json_root')
+def test_get_works(xos_private_api):
     """
     Test get and save XOS works saves expected JSON files.
     """
-    acmi_api.JSON_ROOT = tmp_path
-    xos_private_api = XOSAPI()
     xos_private_api.get_works()
     with open(acmi_api.JSON_ROOT / 'works/index.json', 'rb') as index_page_1:
         index_page_1_json = json.load(index_page_1)
@@ -400,25 +447,22 @@ def test_get_works(tmp_path):
     assert not os.path.isfile(acmi_api.JSON_ROOT / 'works/3.json')
 
 
-@patch('requests.get', MagicMock(side_effect=mocked_requests_get))
-@patch('app.api.s3_resource.Object', MagicMock(side_effect=mock_boto3))
-def test_delete_works(tmp_path):
+@patch('requests.Session.get', mocked_requests_get)
+@patch('app.api.s3_resource.Object', mock_boto3)
+@pytest.mark.usefixtures('json_root')
+def test_delete_works(tmp_path, xos_private_api):
     """
     Test delete XOS works removes expected JSON files.
     """
-    acmi_api.JSON_ROOT = tmp_path
-    xos_private_api = XOSAPI()
     xos_private_api.get_works()
-    assert os.path.isfile(acmi_api.JSON_ROOT / 'works/index.json')
-    assert os.path.isfile(acmi_api.JSON_ROOT / 'works/index_page_2.json')
-    assert os.path.isfile(acmi_api.JSON_ROOT / 'works/1.json')
-    assert os.path.isfile(acmi_api.JSON_ROOT / 'works/2.json')
+    snapshot = tmp_path / 'snapshot'
+    shutil.copytree(acmi_api.JSON_ROOT, snapshot)
+    works_files = {'index.json', 'index_page_2.json', '1.json', '2.json'}
+    assert works_files <= set(os.listdir(acmi_api.JSON_ROOT / 'works'))
     with patch('elasticsearch.Elasticsearch.delete', MagicMock()) as mock_search_delete:
         xos_private_api.delete_works()
-        assert os.path.isfile(acmi_api.JSON_ROOT / 'works/index.json')
-        assert os.path.isfile(acmi_api.JSON_ROOT / 'works/index_page_2.json')
-        assert os.path.isfile(acmi_api.JSON_ROOT / 'works/1.json')
-        assert not os.path.isfile(acmi_api.JSON_ROOT / 'works/2.json')
+        assert set(os.listdir(acmi_api.JSON_ROOT / 'works')) & works_files == \
+            works_files - {'2.json'}
         assert mock_search_delete.call_args[1]['index'] == 'works'
         assert mock_search_delete.call_args[1]['id'] == '2'
 
@@ -430,7 +474,8 @@ def test_delete_works(tmp_path):
             side_effect=search_delete_error,
         ),
     ) as mock_search_delete:
-        xos_private_api.get_works()
+        shutil.rmtree(acmi_api.JSON_ROOT)
+        shutil.copytree(snapshot, acmi_api.JSON_ROOT)
         assert os.path.isfile(acmi_api.JSON_ROOT / 'works/2.json')
         xos_private_api.delete_works()
         assert not os.path.isfile(acmi_api.JSON_ROOT / 'works/2.json')
@@ -451,9 +496,10 @@ def test_delete_works(tmp_path):
         assert not os.path.isfile(acmi_api.JSON_ROOT / 'works/2.json')
 
 
-@patch('requests.get', MagicMock(side_effect=mocked_requests_get))
-@patch('app.api.s3_resource.Object', MagicMock(side_effect=mock_boto3))
-def test_xos_api_params():
+@patch('requests.Session.get', mocked_requests_get)
+@patch('app.api.s3_resource.Object', mock_boto3)
+@pytest.mark.usefixtures('json_root')
+def test_xos_api_params(xos_private_api):
     """
     Test the default XOSAPI params aren't mutated by method calls.
     """
@@ -462,7 +508,6 @@ def test_xos_api_params():
         'unpublished': False,
         'external': False,
     }
-    xos_private_api = XOSAPI()
     assert xos_private_api.params == params
     xos_private_api.get_works()
     assert xos_private_api.params == params
@@ -470,165 +515,201 @@ def test_xos_api_params():
     assert xos_private_api.params == params
 
 
-@patch('app.api.s3_resource.Object', MagicMock(side_effect=mock_boto3))
-@patch('app.api.destination_bucket', MagicMock())
-def test_update_assets():
+@pytest.mark.slow
+@pytest.mark.usefixtures('mock_s3')
+@pytest.mark.parametrize(
+    'include_images, include_videos, video_links',
+    [
+        (True, True, ['https://vimeo.com/19599227', 'https://youtu.be/tCI396HyhbQ']),
+        (True, False, ['https://youtu.be/tCI396HyhbQ']),
+        (False, False, ['https://youtu.be/tCI396HyhbQ']),
+    ],
+)
+def test_update_assets(xos_private_api, include_images, include_videos, video_links):
     """
     Test update assets uploads and renames asset links.
     """
-    with open('tests/data/100542.json', 'rb') as work:
-        acmi_api.INCLUDE_IMAGES = True
-        acmi_api.INCLUDE_VIDEOS = True
-        work_json = json.load(work)
-        xos_private_api = XOSAPI()
-        work_json_1 = xos_private_api.update_assets(work_json)
-        thumbnail_filename = (
-            f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
-            'image/Z000133_Webwurld_Still2_ACMI.tif.1200x1200_q85.jpg'
-        )
-        assert work_json_1['thumbnail']['image_url'] == thumbnail_filename
-        assert work_json_1['images'][0]['image_file'] == \
-            thumbnail_filename.replace('.1200x1200_q85.jpg', '')
-        assert work_json_1['images'][0]['image_file_l'] == \
-            thumbnail_filename.replace('1200x1200', '3840x3840')
-        assert work_json_1['video_links'][0]['uri'] == 'https://vimeo.com/19599227'
-        assert work_json_1['video_links'][1]['uri'] == 'https://youtu.be/tCI396HyhbQ'
-
-        acmi_api.INCLUDE_IMAGES = True
-        acmi_api.INCLUDE_VIDEOS = False
-        work_json_2 = xos_private_api.update_assets(work_json)
-        assert not work_json_2.get('thumbnail')
-        assert work_json_2.get('images')
-        assert work_json_2['video_links'][0]['uri'] == 'https://youtu.be/tCI396HyhbQ'
-        assert len(work_json_2['video_links']) == 1
-
-        acmi_api.INCLUDE_IMAGES = False
-        acmi_api.INCLUDE_VIDEOS = False
-        work_json_3 = xos_private_api.update_assets(work_json)
-        assert not work_json_3.get('thumbnail')
-        assert not work_json_3.get('images')
-        assert work_json_3['video_links'][0]['uri'] == 'https://youtu.be/tCI396HyhbQ'
-        assert len(work_json_3['video_links']) == 1
-
-    with open('tests/data/111326.json', 'rb') as video:
-        acmi_api.INCLUDE_IMAGES = True
-        acmi_api.INCLUDE_VIDEOS = True
-        video_json = json.load(video)
-        xos_private_api = XOSAPI()
-        video_json_1 = xos_private_api.update_assets(video_json)
-        thumbnail_filename = (
-            f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
-            'video/snapshot_1657_669s.jpg'
-        )
-        video_filename = (
-            f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
-            'video/a_000011_ap01_FiftyYearsOfService.mp4'
-        )
-        assert video_json_1['thumbnail']['image_url'] == thumbnail_filename
-        assert video_json_1['videos'][0]['resource'] == video_filename
+    work_json = xos_private_api.update_assets(
+        json.loads(FIXTURES['100542.json']),
+        include_images=include_images,
+        include_videos=include_videos,
+    )
+    image_filename = (
+        f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
+        'image/Z000133_Webwurld_Still2_ACMI.tif'
+    )
+    thumbnail_filename = f'{image_filename}.1200x1200_q85.jpg'
+    large_image_filename = f'{image_filename}.3840x3840_q85.jpg'
+    if include_images and include_videos:
+        assert work_json['thumbnail']['image_url'] == thumbnail_filename
+    else:
+        assert not work_json.get('thumbnail')
+    if include_images:
+        assert work_json['images'][0]['image_file'] == image_filename
+        assert work_json['images'][0]['image_file_l'] == large_image_filename
+    else:
+        assert not work_json.get('images')
+    assert [link['uri'] for link in work_json['video_links']] == video_links
+
+
+@pytest.mark.slow
+@pytest.mark.usefixtures('mock_s3')
+def test_update_assets_default_settings(monkeypatch, xos_private_api):
+    """
+    Test update assets falls back to the INCLUDE_IMAGES and INCLUDE_VIDEOS settings.
+    """
+    monkeypatch.setattr(acmi_api, 'INCLUDE_IMAGES', True)
+    monkeypatch.setattr(acmi_api, 'INCLUDE_VIDEOS', True)
+    work_json = xos_private_api.update_assets(json.loads(FIXTURES['100542.json']))
+    assert work_json['thumbnail']['image_url'] == (
+        f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
+        'image/Z000133_Webwurld_Still2_ACMI.tif.1200x1200_q85.jpg'
+    )
+    assert work_json['images']
+    assert [link['uri'] for link in work_json['video_links']] == [
+        'https://vimeo.com/19599227',
+        'https://youtu.be/tCI396HyhbQ',
+    ]
 
-        acmi_api.INCLUDE_IMAGES = False
-        acmi_api.INCLUDE_VIDEOS = True
-        video_json_3 = xos_private_api.update_assets(video_json)
-        assert not video_json_3.get('thumbnail')
-        assert video_json_3.get('videos')
 
-        acmi_api.INCLUDE_IMAGES = False
-        acmi_api.INCLUDE_VIDEOS = False
-        video_json_3 = xos_private_api.update_assets(video_json)
-        assert not video_json_3.get('thumbnail')
-        assert not video_json_3.get('videos')
+def test_update_assets_leaves_input_unchanged(xos_private_api):
+    """
+    Test update assets returns a new dict when it has no asset links to rewrite.
+    """
+    work_json = {
+        'id': 1,
+        'thumbnail': {'image_url': 'https://example.com/thumbnail.jpg'},
+        'images': [{'image_file': 'https://example.com/image.jpg'}],
+        'video_links': [{'uri': 'https://vimeo.com/1'}, {'uri': 'https://youtu.be/1'}],
+    }
+    original_json = copy.deepcopy(work_json)
+    updated_json = xos_private_api.update_assets(
+        work_json,
+        include_images=False,
+        include_videos=False,
+    )
+    assert work_json == original_json
+    assert not updated_json.get('thumbnail')
+    assert not updated_json.get('images')
+    assert updated_json['video_links'] == [{'uri': 'https://youtu.be/1'}]
+
+
+@pytest.mark.slow
+@pytest.mark.usefixtures('mock_s3')
+@pytest.mark.parametrize(
+    'include_images, include_videos',
+    [
+        (True, True),
+        (False, True),
+        (False, False),
+    ],
+)
+def test_update_assets_with_video(xos_private_api, include_images, include_videos):
+    """
+    Test update assets uploads and renames Video asset links.
+    """
+    video_json = xos_private_api.update_assets(
+        json.loads(FIXTURES['111326.json']),
+        include_images=include_images,
+        include_videos=include_videos,
+    )
+    thumbnail_filename = (
+        f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
+        'video/snapshot_1657_669s.jpg'
+    )
+    video_filename = (
+        f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
+        'video/a_000011_ap01_FiftyYearsOfService.mp4'
+    )
+    if include_images and include_videos:
+        assert video_json['thumbnail']['image_url'] == thumbnail_filename
+    else:
+        assert not video_json.get('thumbnail')
+    if include_videos:
+        assert video_json['videos'][0]['resource'] == video_filename
+    else:
+        assert not video_json.get('videos')
 
 
-@patch('app.api.s3_resource.Object', MagicMock(side_effect=mock_boto3))
-@patch('app.api.destination_bucket', MagicMock())
-def test_update_assets_with_audio():
+@pytest.mark.slow
+@pytest.mark.usefixtures('mock_s3')
+@pytest.mark.parametrize('include_assets', [True, False])
+def test_update_assets_with_audio(xos_private_api, include_assets):
     """
     Test update assets uploads and renames Audio asset links.
     Note: thumbnails are always uploaded
     """
-    with open('tests/data/audio_1.json', 'rb') as audio:
-        acmi_api.INCLUDE_IMAGES = True
-        acmi_api.INCLUDE_VIDEOS = True
-        audio_json = json.load(audio)
-        xos_private_api = XOSAPI()
-        audio_json_1 = xos_private_api.update_assets(audio_json)
-        thumbnail_filename = (
-            f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
-            'image/Marshmallow_Laser_Feast_We_Live_In_An_Ocean_of_Air'
-            '_Courtesy_of_artists_2.jpg.1200x1200_q85.jpg'
-        )
-        resource_filename = (
-            f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/audio/work_122500.mp3'
-        )
-        assert audio_json_1['work']['thumbnail']['image_url'] == thumbnail_filename
-        assert audio_json_1['resource'] == resource_filename
-
-        acmi_api.INCLUDE_IMAGES = False
-        acmi_api.INCLUDE_VIDEOS = False
-        audio_json_1 = xos_private_api.update_assets(audio_json)
-        assert audio_json_1['work']['thumbnail']['image_url'] == thumbnail_filename
-        assert audio_json_1['resource'] == resource_filename
+    audio_json = xos_private_api.update_assets(
+        json.loads(FIXTURES['audio_1.json']),
+        include_images=include_assets,
+        include_videos=include_assets,
+    )
+    thumbnail_filename = (
+        f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
+        'image/Marshmallow_Laser_Feast_We_Live_In_An_Ocean_of_Air'
+        '_Courtesy_of_artists_2.jpg.1200x1200_q85.jpg'
+    )
+    resource_filename = (
+        f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/audio/work_122500.mp3'
+    )
+    assert audio_json['work']['thumbnail']['image_url'] == thumbnail_filename
+    assert audio_json['resource'] == resource_filename
 
 
-@patch('app.api.s3_resource.Object', MagicMock(side_effect=mock_boto3))
-@patch('app.api.destination_bucket', MagicMock())
-def test_update_assets_with_constellations():
+@pytest.mark.slow
+@pytest.mark.usefixtures('mock_s3')
+@pytest.mark.parametrize('include_assets', [True, False])
+def test_update_assets_with_constellations(xos_private_api, include_assets):
     """
     Test update assets uploads and renames Constellation asset links.
     """
-    with open('tests/data/constellation_1.json', 'rb') as constellation:
-        acmi_api.INCLUDE_IMAGES = True
-        acmi_api.INCLUDE_VIDEOS = True
-        constellation_json = json.load(constellation)
-        xos_private_api = XOSAPI()
-        constellation_json_1 = xos_private_api.update_assets(constellation_json)
-        thumbnail_filename = (
-            f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
-            'image/P177007_MyBrilliantCareerBook_34.jpg.1200x1200_q85.jpg'
-        )
-        assert constellation_json_1['key_work']['thumbnail']['image_url'] == thumbnail_filename
-        assert constellation_json_1['links'][2]['start']['thumbnail']['image_url'] == \
+    constellation_json = xos_private_api.update_assets(
+        json.loads(FIXTURES['constellation_1.json']),
+        include_images=include_assets,
+        include_videos=include_assets,
+    )
+    thumbnail_filename = (
+        f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
+        'image/P177007_MyBrilliantCareerBook_34.jpg.1200x1200_q85.jpg'
+    )
+    if include_assets:
+        assert constellation_json['key_work']['thumbnail']['image_url'] == thumbnail_filename
+        assert constellation_json['links'][2]['start']['thumbnail']['image_url'] == \
             thumbnail_filename
-
-        acmi_api.INCLUDE_IMAGES = False
-        acmi_api.INCLUDE_VIDEOS = False
-        constellation_json_1 = xos_private_api.update_assets(constellation_json)
-        assert not constellation_json_1['key_work'].get('thumbnail')
-        assert not constellation_json_1['links'][2]['start'].get('thumbnail')
+    else:
+        assert not constellation_json['key_work'].get('thumbnail')
+        assert not constellation_json['links'][2]['start'].get('thumbnail')
 
 
-@patch('app.api.s3_resource.Object', MagicMock(side_effect=mock_boto3))
-@patch('app.api.destination_bucket', MagicMock())
-def test_update_assets_with_creators():
+@pytest.mark.slow
+@pytest.mark.usefixtures('mock_s3')
+@pytest.mark.parametrize('include_assets', [True, False])
+def test_update_assets_with_creators(xos_private_api, include_assets):
     """
     Test update assets uploads and renames Creator asset links.
     """
-    with open('tests/data/creator_34373.json', 'rb') as creator:
-        acmi_api.INCLUDE_IMAGES = True
-        acmi_api.INCLUDE_VIDEOS = True
-        creator_json = json.load(creator)
-        xos_private_api = XOSAPI()
-        creator_json_1 = xos_private_api.update_assets(creator_json)
-        image_filename = (
-            f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
-            'image/AgnC3A8s_Varda_28Berlinale_201929_28cropped29.jpg'
-        )
-        assert creator_json_1['image'] == image_filename
-
-        acmi_api.INCLUDE_IMAGES = False
-        acmi_api.INCLUDE_VIDEOS = False
-        creator_json_1 = xos_private_api.update_assets(creator_json)
-        assert not creator_json_1.get('image')
+    creator_json = xos_private_api.update_assets(
+        json.loads(FIXTURES['creator_34373.json']),
+        include_images=include_assets,
+        include_videos=include_assets,
+    )
+    image_filename = (
+        f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
+        'image/AgnC3A8s_Varda_28Berlinale_201929_28cropped29.jpg'
+    )
+    if include_assets:
+        assert creator_json['image'] == image_filename
+    else:
+        assert not creator_json.get('image')
 
 
-@patch('requests.get')
-def test_get_creators(mock_get):
+@patch('requests.Session.get')
+@pytest.mark.usefixtures('json_root')
+def test_get_creators(mock_get, xos_private_api):
     """
     Test get_creators default params.
     """
-    mock_get.return_value = MockResponse('{"results": []}', 200)
-    xos_private_api = XOSAPI()
+    mock_get.return_value = MockResponse(b'{"results": []}', 200)
     xos_private_api.get_creators()
     assert not mock_get.call_args_list[0][1]['params']['external']
     assert mock_get.call_args_list[0][1]['params']['date_modified__gte']
@@ -637,23 +718,21 @@ def test_get_creators(mock_get):
     assert not mock_get.call_args_list[1][1]['params'].get('date_modified__gte')
 
     acmi_api.ALL_CREATORS = True
-    xos_private_api = XOSAPI()
     xos_private_api.get_creators()
     assert not mock_get.call_args_list[2][1]['params']['external']
     assert not mock_get.call_args_list[2][1]['params'].get('date_modified__gte')
 
 
-def test_include_external_filter():
+def test_include_external_filter(xos_private_api):
     """
     Test the INCLUDE_EXTERNAL variable sets the XOS API `exclude` filter as expected.
     """
-    with patch('requests.get', MagicMock()) as mock_get:
-        xos_private_api = XOSAPI()
+    with patch('requests.Session.get', MagicMock()) as mock_get:
         xos_private_api.get('works')
         assert not mock_get.call_args[1]['params']['external']
         assert not mock_get.call_args[1]['params']['unpublished']
 
-    with patch('requests.get', MagicMock()) as mock_get:
+    with patch('requests.Session.get', MagicMock()) as mock_get:
         acmi_api.INCLUDE_EXTERNAL = True
         xos_private_api = XOSAPI()
         xos_private_api.get('works')
@@ -661,216 +740,206 @@ def test_include_external_filter():
         assert not mock_get.call_args[1]['params']['unpublished']
 
 
-def test_search_api():
+def test_search_api(client):
     """
     Test the Search API root returns expected content.
     """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/search/',
-            content_type='application/json',
-        )
-        assert response.status_code == 400
-        assert response.json['message'] == 'Try adding a search query. e.g. /search/?query=xos'
+    response = client.get(
+        '/search/',
+        content_type='application/json',
+    )
+    assert response.status_code == 400
+    assert response.json['message'] == 'Try adding a search query. e.g. /search/?query=xos'
 
 
-@patch('elasticsearch.Elasticsearch.search', MagicMock(side_effect=mock_search))
-def test_search_api_results():
-    """
-    Test the Search API results returns expected content.
-    """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
+@pytest.mark.usefixtures('es_mock')
+@pytest.mark.parametrize(
+    'url, expected',
+    [
+        (
             '/search/?query=xos',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['count'] == 243
-        assert response.json['next'] == 'http://localhost/search/?query=xos&page=2'
-        assert not response.json['previous']
-        assert len(response.json['results']) == 20
-        assert response.json['results'][0]['id'] == 114496
-
-    with acmi_api.application.test_client() as client:
-        response = client.get(
+            {
+                'count': 243,
+                'next': 'http://localhost/search/?query=xos&page=2',
+                'previous': None,
+                'results': 20,
+                'first_id': 114496,
+            },
+        ),
+        (
             '/search/?query=xos&page=2',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['count'] == 243
-        assert response.json['next'] == 'http://localhost/search/?query=xos&page=3'
-        assert response.json['previous'] == 'http://localhost/search/?query=xos&page=1'
-        assert len(response.json['results']) == 20
-        assert response.json['results'][0]['id'] == 107348
-
-    with acmi_api.application.test_client() as client:
-        response = client.get(
+            {
+                'count': 243,
+                'next': 'http://localhost/search/?query=xos&page=3',
+                'previous': 'http://localhost/search/?query=xos&page=1',
+                'results': 20,
+                'first_id': 107348,
+            },
+        ),
+        (
             '/search/?query=xos&page=2&size=10',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['count'] == 243
-        assert response.json['next'] == 'http://localhost/search/?query=xos&size=10&page=3'
-        assert response.json['previous'] == 'http://localhost/search/?query=xos&size=10&page=1'
-        assert len(response.json['results']) == 10
-        assert response.json['results'][0]['id'] == 106665
-
-    with acmi_api.application.test_client() as client:
-        response = client.get(
+            {
+                'count': 243,
+                'next': 'http://localhost/search/?query=xos&size=10&page=3',
+                'previous': 'http://localhost/search/?query=xos&size=10&page=1',
+                'results': 10,
+                'first_id': 106665,
+            },
+        ),
+        (
             '/search/?query=dog&field=title&size=4&page=3',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['count'] == 63
-        assert response.json['next'] == \
-            'http://localhost/search/?query=dog&field=title&size=4&page=4'
-        assert response.json['previous'] == \
-            'http://localhost/search/?query=dog&field=title&size=4&page=2'
-        assert len(response.json['results']) == 4
-        assert response.json['results'][0]['id'] == 108013
-
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/search/?query=xos&raw=true',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['hits']['total']['value'] == 243
-        assert len(response.json['hits']['hits']) == 20
-        assert response.json['hits']['hits'][0]['_source']['id'] == 114496
-
-    with acmi_api.application.test_client() as client:
-        response = client.get(
+            {
+                'count': 63,
+                'next': 'http://localhost/search/?query=dog&field=title&size=4&page=4',
+                'previous': 'http://localhost/search/?query=dog&field=title&size=4&page=2',
+                'results': 4,
+                'first_id': 108013,
+            },
+        ),
+        (
             '/search/?query=xos&field=title',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['count'] == 1
-        assert response.json['next'] == 'http://localhost/search/?query=xos&field=title&page=2'
-        assert not response.json['previous']
-        assert len(response.json['results']) == 1
-        assert response.json['results'][0]['id'] == 78738
+            {
+                'count': 1,
+                'next': 'http://localhost/search/?query=xos&field=title&page=2',
+                'previous': None,
+                'results': 1,
+                'first_id': 78738,
+            },
+        ),
+    ],
+)
+def test_search_api_results(client, url, expected):
+    """
+    Test the Search API results returns expected content.
+    """
+    response = client.get(
+        url,
+        content_type='application/json',
+    )
+    assert response.status_code == 200
+    assert response.json['count'] == expected['count']
+    assert response.json['next'] == expected['next']
+    assert response.json['previous'] == expected['previous']
+    assert len(response.json['results']) == expected['results']
+    assert response.json['results'][0]['id'] == expected['first_id']
 
 
-@patch('elasticsearch.Elasticsearch.search', MagicMock(side_effect=mock_search))
-def test_search_api_results_failures():
+@pytest.mark.usefixtures('es_mock')
+def test_search_api_results_raw(client):
+    """
+    Test the Search API returns the raw Elasticsearch results when asked.
+    """
+    response = client.get(
+        '/search/?query=xos&raw=true',
+        content_type='application/json',
+    )
+    assert response.status_code == 200
+    assert response.json['hits']['total']['value'] == 243
+    assert len(response.json['hits']['hits']) == 20
+    assert response.json['hits']['hits'][0]['_source']['id'] == 114496
+
+
+@pytest.mark.usefixtures('es_mock')
+@pytest.mark.parametrize(
+    'query, status_code, message',
+    [
+        ('404', 404, 'No results found, sorry.'),
+        ('400', 400, 'Error in your query.'),
+        ('503', 503, 'Sorry, search is unavailable at the moment. Please try again later.'),
+        ('504', 504, 'Sorry, your search request timed out. Please try again later.'),
+    ],
+)
+def test_search_api_results_failures(client, query, status_code, message):
     """
     Test the Search API results fails as expected.
     """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/search/?query=404',
-            content_type='application/json',
-        )
-        assert response.status_code == 404
-        assert response.json['message'] == 'No results found, sorry.'
-
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/search/?query=400',
-            content_type='application/json',
-        )
-        assert response.status_code == 400
-        assert response.json['message'] == 'Error in your query.'
-
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/search/?query=503',
-            content_type='application/json',
-        )
-        assert response.status_code == 503
-        assert response.json['message'] == \
-            'Sorry, search is unavailable at the moment. Please try again later.'
-
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/search/?query=504',
-            content_type='application/json',
-        )
-        assert response.status_code == 504
-        assert response.json['message'] == \
-            'Sorry, your search request timed out. Please try again later.'
+    response = client.get(
+        f'/search/?query={query}',
+        content_type='application/json',
+    )
+    assert response.status_code == status_code
+    assert response.json['message'] == message
 
 
-@patch('elasticsearch.Elasticsearch.search', MagicMock(side_effect=mock_search))
-def test_search_api_audio():
+@pytest.mark.usefixtures('es_mock')
+def test_search_api_audio(client):
     """
     Test the Search API with the audio resource.
     """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/search/?query=ocean&resource=audio',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['count'] == 1
-        assert response.json['next'] == \
-            'http://localhost/search/?query=ocean&resource=audio&page=2'
-        assert not response.json['previous']
-        assert len(response.json['results']) == 1
-        assert response.json['results'][0]['id'] == 15
-        assert response.json['results'][0]['work']['labels'][0] == 61958
+    response = client.get(
+        '/search/?query=ocean&resource=audio',
+        content_type='application/json',
+    )
+    assert response.status_code == 200
+    assert response.json['count'] == 1
+    assert response.json['next'] == \
+        'http://localhost/search/?query=ocean&resource=audio&page=2'
+    assert not response.json['previous']
+    assert len(response.json['results']) == 1
+    assert response.json['results'][0]['id'] == 15
+    assert response.json['results'][0]['work']['labels'][0] == 61958
 
 
-@patch('elasticsearch.Elasticsearch.search', MagicMock(side_effect=mock_search))
-def test_search_api_constellations():
+@pytest.mark.usefixtures('es_mock')
+def test_search_api_constellations(client):
     """
     Test the Search API with the constellations resource.
     """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/search/?query=pen&resource=constellations',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['count'] == 5
-        assert response.json['next'] == \
-            'http://localhost/search/?query=pen&resource=constellations&page=2'
-        assert not response.json['previous']
-        assert len(response.json['results']) == 5
-        assert response.json['results'][0]['id'] == 1
-        assert response.json['results'][0]['name'] == 'Pen names, poems and puppets'
+    response = client.get(
+        '/search/?query=pen&resource=constellations',
+        content_type='application/json',
+    )
+    assert response.status_code == 200
+    assert response.json['count'] == 5
+    assert response.json['next'] == \
+        'http://localhost/search/?query=pen&resource=constellations&page=2'
+    assert not response.json['previous']
+    assert len(response.json['results']) == 5
+    assert response.json['results'][0]['id'] == 1
+    assert response.json['results'][0]['name'] == 'Pen names, poems and puppets'
 
 
-@patch('elasticsearch.Elasticsearch.search', MagicMock(side_effect=mock_search))
-def test_search_api_creators():
+@pytest.mark.usefixtures('es_mock')
+def test_search_api_creators(client):
     """
     Test the Search API with the creators resource.
     """
-    with acmi_api.application.test_client() as client:
-        response = client.get(
-            '/search/?query=agnes&resource=creators',
-            content_type='application/json',
-        )
-        assert response.status_code == 200
-        assert response.json['count'] == 1
-        assert response.json['next'] == \
-            'http://localhost/search/?query=agnes&resource=creators&page=2'
-        assert not response.json['previous']
-        assert len(response.json['results']) == 1
-        assert response.json['results'][0]['id'] == 34373
-        assert response.json['results'][0]['name'] == 'Agnes Varda'
+    response = client.get(
+        '/search/?query=agnes&resource=creators',
+        content_type='application/json',
+    )
+    assert response.status_code == 200
+    assert response.json['count'] == 1
+    assert response.json['next'] == \
+        'http://localhost/search/?query=agnes&resource=creators&page=2'
+    assert not response.json['previous']
+    assert len(response.json['results']) == 1
+    assert response.json['results'][0]['id'] == 34373
+    assert response.json['results'][0]['name'] == 'Agnes Varda'
 
 
-def test_xos_private_api_retries(tmp_path):
+def test_xos_private_api_retries(xos_private_api):
     """
     Test the XOS private API interface retries 3 times before raising an exception.
     """
-    with patch('requests.get', MagicMock(side_effect=requests.exceptions.ReadTimeout)) as mock_get:
-        acmi_api.JSON_ROOT = tmp_path
-        xos_private_api = XOSAPI()
+    calls = []
+
+    def read_timeout(*args, **kwargs):
+        calls.append(kwargs['url'])
+        raise requests.exceptions.ReadTimeout
+
+    with patch('requests.Session.get', read_timeout):
         with pytest.raises(requests.exceptions.ReadTimeout):
             xos_private_api.get('works')
-            assert mock_get.call_count == 3
+    assert len(calls) == 3
 
 
-def test_generate_tsv(tmp_path):
+def test_generate_tsv(tmp_path, xos_private_api):
     """
     Test the generated TSV is in the correct format with the right number of rows.
     """
     acmi_api.TSV_ROOT = tmp_path
-    acmi_api.JSON_ROOT = '/code/tests/data/'
-    xos_private_api = XOSAPI()
+    acmi_api.JSON_ROOT = TEST_DATA_ROOT
     xos_private_api.generate_tsv('works')
     assert os.path.isfile(acmi_api.TSV_ROOT / 'works.tsv')
     with open(f'{acmi_api.TSV_ROOT}/works.tsv', encoding='utf-8') as tsv_file:
@@ -878,10 +947,7 @@ def test_generate_tsv(tmp_path):
         header = next(reader)
         assert len(header) == 49
         assert header[0] == 'id'
-        row_count = 0
-        for _ in reader:
-            row_count += 1
-        assert row_count == 4
+        assert sum(1 for _ in reader) == 4
 
     xos_private_api.generate_tsv('creators')
     assert os.path.isfile(acmi_api.TSV_ROOT / 'creators.tsv')
@@ -890,13 +956,10 @@ def test_generate_tsv(tmp_path):
         header = next(reader)
         assert len(header) == 15
         assert header[0] == 'id'
-        row_count = 0
-        for _ in reader:
-            row_count += 1
-        assert row_count == 1
+        assert sum(1 for _ in reader) == 1
 
 
-def test_keys_from_dicts():
+def test_keys_from_dicts(xos_private_api):
     """
     Test the keys_from_dicts method returns the correct data.
     """
@@ -907,7 +970,7 @@ def test_keys_from_dicts():
     your_list.append(dict_1)
     your_list.append(dict_2)
     your_list.append(dict_3)
-    keys = XOSAPI().keys_from_dicts('id', your_list)
+    keys = xos_private_api.keys_from_dicts('id', your_list)
     assert keys == '1,9,2'
 
     your_list = []
@@ -917,11 +980,11 @@ def test_keys_from_dicts():
     your_list.append(dict_1)
     your_list.append(dict_2)
     your_list.append(dict_3)
-    keys = XOSAPI().keys_from_dicts('name', your_list)
+    keys = xos_private_api.keys_from_dicts('name', your_list)
     assert keys == 'Pip,Simon,Sam'
 
 
-def test_nested_value():
+def test_nested_value(xos_private_api):
     """
     Test the nested_value method returns the correct data.
     """
@@ -931,26 +994,26 @@ def test_nested_value():
             'that': 'The other.',
         }
     }
-    value = XOSAPI().nested_value(dictionary, ['this', 'that'], default_value)
+    value = xos_private_api.nested_value(dictionary, ['this', 'that'], default_value)
     assert value == 'The other.'
-    value = XOSAPI().nested_value(dictionary, ['this', 'something'], default_value)
+    value = xos_private_api.nested_value(dictionary, ['this', 'something'], default_value)
     assert value == 'Oh really?'
-    value = XOSAPI().nested_value(dictionary, ['something', 'else'], default_value)
+    value = xos_private_api.nested_value(dictionary, ['something', 'else'], default_value)
     assert value == 'Oh really?'
 
 
-def test_strings_from_list():
+def test_strings_from_list(xos_private_api):
     """
     Test the strings_from_list method returns the correct data.
     """
     your_list = [1, 2, 7, 9]
-    string = XOSAPI().strings_from_list(your_list)
+    string = xos_private_api.strings_from_list(your_list)
     assert string == '1,2,7,9'
-    string = XOSAPI().strings_from_list(666)
+    string = xos_private_api.strings_from_list(666)
     assert string == ''
 
 
-def test_external_references_to_string():
+def test_external_references_to_string(xos_private_api):
     """
     Test the external_references_to_string method returns the correct data.
     """
@@ -970,18 +1033,17 @@ def test_external_references_to_string():
             'source_identifier': '95396',
         },
     ]
-    string = XOSAPI().external_references_to_string(external_references)
+    string = xos_private_api.external_references_to_string(external_references)
     assert string == '(Wikidata,Q101096725),(TMDB-TV,95396)'
-    string = XOSAPI().strings_from_list(666)
+    string = xos_private_api.strings_from_list(666)
     assert string == ''
 
 
-def test_remove_external_works():
+def test_remove_external_works(xos_private_api):
     """
     Test removing external works removes siblings with an acmi_id
     prefix of AEO, LN or P from group_siblings.
     """
-    xos_private_api = XOSAPI()
     work_json = {
         'id': 119669,
         'group_siblings': [
@@ -1047,3 +1109,30 @@ def test_remove_external_works():
     assert works_json['results'][0]['group_siblings'][0]['id'] == 126
     assert len(works_json['results'][1]['group_siblings']) == 1
     assert works_json['results'][1]['group_siblings'][0]['id'] == 128
+
+
+def test_remove_external_works_missing_acmi_id(xos_private_api):
+    """
+    Test removing external works keeps siblings without an acmi_id.
+    """
+    work_json = {
+        'id': 119669,
+        'group_siblings': [
+            {'id': 123, 'acmi_id': 'P123'},
+            {'id': 126, 'acmi_id': '126'},
+            {'id': 127},
+            {'id': 128, 'acmi_id': 'LN128'},
+        ],
+    }
+    xos_private_api.remove_external_works(work_json)
+    assert [sibling['id'] for sibling in work_json['group_siblings']] == [126, 127]
+
+
+def test_next_page(xos_private_api):
+    """
+    Test the next_page method returns the page number from a next link.
+    """
+    page = xos_private_api.next_page('https://xos.acmi.net.au/api/works/?page=2&page_size=10')
+    assert page == '2'
+    page = xos_private_api.next_page('https://xos.acmi.net.au/api/works/?page_size=10')
+    assert not page